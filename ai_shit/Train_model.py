@@ -1,9 +1,32 @@
 # train_model.py
+import os
+
 from tensorflow.keras.applications.inception_v3 import InceptionV3
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
-from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Input
+from tensorflow.keras.models import Model, Sequential
 from tensorflow.keras.optimizers import Adam
-from data_preprocessing import get_data_generators
+from data_preprocessing import cache_signature, get_image_dataset, list_image_files
+from bottleneck_cache import get_or_compute_bottleneck
+
+# 학습 설정
+train_dir = "dataset/train"
+val_dir = "dataset/val"
+cache_dir = "cache"            # TFRecord / 임베딩 캐시 저장 위치
+use_tfrecord_cache = True       # 리사이즈한 이미지를 TFRecord 샤드로 저장해서 재사용
+use_bottleneck_cache = True     # 헤드 학습 때 베이스 모델 출력(임베딩)을 한 번만 계산해서 재사용
+batch_size = 32
+target_size = (299, 299)
+
+# 데이터 로드 (tf.data, 병렬 디코딩 + prefetch)
+train_dataset, class_names = get_image_dataset(
+    train_dir, batch_size=batch_size, target_size=target_size, training=True,
+    cache_dir=os.path.join(cache_dir, "train_images") if use_tfrecord_cache else None,
+)
+val_dataset, _ = get_image_dataset(
+    val_dir, batch_size=batch_size, target_size=target_size,
+    cache_dir=os.path.join(cache_dir, "val_images") if use_tfrecord_cache else None,
+)
+num_classes = len(class_names)  # 클래스 개수
 
 # InceptionV3 모델 불러오기 (최상위 분류층 제외)
 base_model = InceptionV3(weights="imagenet", include_top=False)
@@ -12,25 +35,50 @@ base_model = InceptionV3(weights="imagenet", include_top=False)
 for layer in base_model.layers:
     layer.trainable = False
 
-# 새로운 출력층 추가
-x = base_model.output
-x = GlobalAveragePooling2D()(x)
-x = Dense(1024, activation="relu")(x)
-predictions = Dense(10, activation="softmax")  # 클래스 개수 변경
-
-# 새로운 모델 구성
-model = Model(inputs=base_model.input, outputs=predictions)
+# 특징 추출 부분 (베이스 모델 + 평균 풀링)
+features = GlobalAveragePooling2D()(base_model.output)
+feature_extractor = Model(inputs=base_model.input, outputs=features)
 
-# 데이터 로드
-train_dir = "dataset/train"
-val_dir = "dataset/val"
-train_generator, val_generator = get_data_generators(train_dir, val_dir)
+# 새로운 출력층 (임베딩만 받아서 학습할 수 있게 따로 구성)
+head = Sequential([
+    Input(shape=(features.shape[-1],)),
+    Dense(1024, activation="relu"),
+    Dense(num_classes, activation="softmax"),
+])
 
-# 모델 컴파일
-model.compile(optimizer=Adam(learning_rate=0.001), loss="categorical_crossentropy", metrics=["accuracy"])
+# 새로운 모델 구성 (head 층을 공유하므로 임베딩으로 학습한 가중치가 그대로 들어감)
+model = Model(inputs=base_model.input, outputs=head(features))
 
 # 새롭게 추가한 층만 학습
-model.fit(train_generator, validation_data=val_generator, epochs=10)
+if use_bottleneck_cache:
+    # 증강 없이, 섞지 않은 데이터로 임베딩을 한 번만 계산해서 메모리 맵으로 사용
+    # (임베딩을 고정하므로 이 단계에서는 데이터 증강이 적용되지 않음)
+    # 파일 목록 / 라벨 / target_size / 베이스 모델이 바뀌면 다시 계산
+    train_paths, train_label_ids, _ = list_image_files(train_dir)
+    val_paths, val_label_ids, _ = list_image_files(val_dir)
+    train_plain, _ = get_image_dataset(
+        train_dir, batch_size=batch_size, target_size=target_size,
+        cache_dir=os.path.join(cache_dir, "train_images") if use_tfrecord_cache else None,
+    )
+    train_features, train_labels = get_or_compute_bottleneck(
+        feature_extractor, train_plain, os.path.join(cache_dir, "bottleneck_train"),
+        num_samples=len(train_paths),
+        data_signature=cache_signature(train_paths, train_label_ids, target_size),
+    )
+    val_features, val_labels = get_or_compute_bottleneck(
+        feature_extractor, val_dataset, os.path.join(cache_dir, "bottleneck_val"),
+        num_samples=len(val_paths),
+        data_signature=cache_signature(val_paths, val_label_ids, target_size),
+    )
+    head.compile(optimizer=Adam(learning_rate=0.001), loss="categorical_crossentropy", metrics=["accuracy"])
+    head.fit(
+        train_features, train_labels,
+        validation_data=(val_features, val_labels),
+        batch_size=batch_size, shuffle=True, epochs=10,
+    )
+else:
+    model.compile(optimizer=Adam(learning_rate=0.001), loss="categorical_crossentropy", metrics=["accuracy"])
+    model.fit(train_dataset, validation_data=val_dataset, epochs=10)
 
 # 특정 층부터 학습 가능하게 설정 (Fine-tuning)
 for layer in base_model.layers[-30:]:  # 마지막 30개 층 학습 가능
@@ -39,8 +87,8 @@ for layer in base_model.layers[-30:]:  # 마지막 30개 층 학습 가능
 # 파인튜닝을 위한 낮은 학습률 설정
 model.compile(optimizer=Adam(learning_rate=0.0001), loss="categorical_crossentropy", metrics=["accuracy"])
 
-# 파인튜닝 수행
-model.fit(train_generator, validation_data=val_generator, epochs=10)
+# 파인튜닝 수행 (베이스 모델 출력이 바뀌므로 임베딩 캐시 대신 이미지 파이프라인 사용)
+model.fit(train_dataset, validation_data=val_dataset, epochs=10)
 
 # 모델 저장
 model.save("fine_tuned_inceptionv3.h5")
@@ -0,0 +1,101 @@
+# bottleneck_cache.py
+# 동결된 베이스 모델(InceptionV3 등)의 출력(임베딩)을 한 번만 계산해서 .npy 로 저장
+# 헤드(Dense 층)만 학습할 때는 이미지 대신 이 임베딩을 메모리 맵으로 읽어서 학습하면
+# 매 epoch 마다 베이스 모델을 다시 돌리지 않아도 됨
+import json
+import os
+
+import numpy as np
+
+
+def _paths(cache_prefix):
+    return cache_prefix + "_features.npy", cache_prefix + "_labels.npy"
+
+
+def _manifest_path(cache_prefix):
+    return cache_prefix + "_manifest.json"
+
+
+def _backbone_id(feature_extractor):
+    # 베이스 모델이 바뀌면 (InceptionV3 -> 다른 모델 등) 임베딩도 다시 계산해야 함
+    return {
+        "name": feature_extractor.name,
+        "output_shape": list(feature_extractor.outputs[0].shape),
+        "params": int(feature_extractor.count_params()),
+    }
+
+
+def _manifest(feature_extractor, num_samples, data_signature):
+    return {"backbone": _backbone_id(feature_extractor), "num_samples": num_samples, "data": data_signature}
+
+
+def compute_bottleneck(feature_extractor, dataset, cache_prefix, num_samples, data_signature=None):
+    """
+    dataset (이미지, one-hot 라벨) 배치를 feature_extractor 에 통과시켜
+    cache_prefix_features.npy / cache_prefix_labels.npy 로 저장합니다.
+    증강 없이 섞지 않은 데이터셋을 넘겨야 합니다.
+    다 저장한 뒤 베이스 모델 / 데이터 정보를 cache_prefix_manifest.json 에 기록합니다.
+    """
+    features_path, labels_path = _paths(cache_prefix)
+    manifest_path = _manifest_path(cache_prefix)
+    os.makedirs(os.path.dirname(features_path) or ".", exist_ok=True)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # 중간에 멈추면 옛 manifest 로 새 캐시를 맞다고 판단하지 않도록
+
+    features = None
+    labels = None
+    offset = 0
+    for images, batch_labels in dataset:
+        batch_features = feature_extractor(images, training=False).numpy()
+        if features is None:
+            # 전체 크기를 미리 잡아둔 파일에 배치 단위로 바로 기록 (메모리에 전부 올리지 않음)
+            features = np.lib.format.open_memmap(
+                features_path + ".tmp", mode="w+", dtype=np.float32,
+                shape=(num_samples, batch_features.shape[1]),
+            )
+            labels = np.lib.format.open_memmap(
+                labels_path + ".tmp", mode="w+", dtype=np.float32,
+                shape=(num_samples, batch_labels.shape[1]),
+            )
+        n = len(batch_features)
+        features[offset:offset + n] = batch_features
+        labels[offset:offset + n] = batch_labels.numpy()
+        offset += n
+
+    if features is None:
+        raise ValueError(f"dataset for {cache_prefix} is empty, nothing to compute")
+    if offset != num_samples:
+        raise ValueError(f"dataset for {cache_prefix} has {offset} samples, expected {num_samples}")
+    features.flush()
+    labels.flush()
+    del features, labels
+    # 다 쓴 다음에 이름을 바꿔서, 중간에 멈춘 캐시를 완성본으로 착각하지 않게 함
+    os.replace(features_path + ".tmp", features_path)
+    os.replace(labels_path + ".tmp", labels_path)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(_manifest(feature_extractor, num_samples, data_signature), f)
+
+
+def load_bottleneck(cache_prefix):
+    features_path, labels_path = _paths(cache_prefix)
+    return np.load(features_path, mmap_mode="r"), np.load(labels_path, mmap_mode="r")
+
+
+def bottleneck_cache_valid(feature_extractor, cache_prefix, num_samples, data_signature=None):
+    features_path, labels_path = _paths(cache_prefix)
+    manifest_path = _manifest_path(cache_prefix)
+    if not all(os.path.exists(path) for path in (features_path, labels_path, manifest_path)):
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest == _manifest(feature_extractor, num_samples, data_signature)
+
+
+def get_or_compute_bottleneck(feature_extractor, dataset, cache_prefix, num_samples, data_signature=None):
+    """
+    저장된 임베딩이 같은 베이스 모델 / 같은 데이터로 만든 것이면 그대로 읽고, 아니면 다시 계산합니다.
+    data_signature: 데이터 정보 (data_preprocessing.cache_signature, 파일 목록 / 라벨 / target_size)
+    """
+    if not bottleneck_cache_valid(feature_extractor, cache_prefix, num_samples, data_signature):
+        compute_bottleneck(feature_extractor, dataset, cache_prefix, num_samples, data_signature)
+    return load_bottleneck(cache_prefix)
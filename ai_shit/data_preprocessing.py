@@ -1,7 +1,16 @@
 # data_preprocessing.py
+import hashlib
+import json
+import os
+import shutil
+
+import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.applications.inception_v3 import preprocess_input
 
+AUTOTUNE = tf.data.AUTOTUNE
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
+
 def get_data_generators(train_dir, val_dir, batch_size=32, target_size=(299, 299)):
     # 데이터 증강 및 전처리
     train_datagen = ImageDataGenerator(
@@ -30,3 +39,147 @@ def get_data_generators(train_dir, val_dir, batch_size=32, target_size=(299, 299
     )
 
     return train_generator, val_generator
+
+
+# ===================== tf.data 파이프라인 =====================
+# ImageDataGenerator 는 매 epoch 마다 파이썬에서 JPEG 을 하나씩 디코딩해서 느림
+# 아래 함수들은 디코딩/리사이즈를 tf.data 에서 병렬로 하고, 원하면 리사이즈한 결과를
+# TFRecord 샤드로 저장해서 다음 epoch / 다음 학습부터는 디코딩을 건너뜀
+
+
+def list_image_files(data_dir):
+    """
+    data_dir/<클래스 이름>/*.jpg -> (파일 경로 목록, 라벨 목록, 클래스 이름 목록)
+    클래스 순서는 flow_from_directory 와 같은 이름순입니다.
+    """
+    class_names = sorted(
+        name for name in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, name))
+    )
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(data_dir, class_name)
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, filename))
+                labels.append(label)
+    return paths, labels, class_names
+
+
+def _decode_and_resize(path, label, target_size):
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, target_size)
+    return tf.cast(tf.round(image), tf.uint8), label
+
+
+def cache_signature(paths, labels, target_size):
+    # 파일 목록 / 라벨 / 파일 크기 / 수정 시각 / target_size 가 같을 때만 같은 캐시로 취급
+    # (TFRecord 캐시와 bottleneck_cache.py 의 임베딩 캐시에서 같이 사용)
+    digest = hashlib.sha256()
+    for path, label in zip(paths, labels):
+        stat = os.stat(path)
+        digest.update(f"{path}\t{label}\t{stat.st_size}\t{stat.st_mtime_ns}\n".encode())
+    return {"target_size": list(target_size), "num_files": len(paths), "files_sha256": digest.hexdigest()}
+
+
+def tfrecord_cache_valid(paths, labels, cache_dir, target_size):
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest.get("signature") == cache_signature(paths, labels, target_size)
+
+
+def write_tfrecord_shards(paths, labels, cache_dir, target_size, num_shards=8):
+    """
+    리사이즈까지 끝난 uint8 이미지를 num_shards 개의 TFRecord 파일로 저장
+    임시 폴더에 다 쓰고 manifest.json 까지 만든 뒤 cache_dir 로 이름을 바꿔서,
+    중간에 멈춘 캐시를 완성본으로 착각하지 않게 함
+    """
+    tmp_dir = cache_dir.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels)).map(
+        lambda p, l: _decode_and_resize(p, l, target_size), num_parallel_calls=AUTOTUNE
+    )
+    writers = [
+        tf.io.TFRecordWriter(os.path.join(tmp_dir, f"shard-{i:03d}-of-{num_shards:03d}.tfrecord"))
+        for i in range(num_shards)
+    ]
+    for i, (image, label) in enumerate(dataset):
+        example = tf.train.Example(features=tf.train.Features(feature={
+            "image": tf.train.Feature(bytes_list=tf.train.BytesList(value=[tf.io.serialize_tensor(image).numpy()])),
+            "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[int(label)])),
+        }))
+        writers[i % num_shards].write(example.SerializeToString())
+    for writer in writers:
+        writer.close()
+
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"signature": cache_signature(paths, labels, target_size), "num_shards": num_shards}, f)
+    shutil.rmtree(cache_dir, ignore_errors=True)  # 예전(다른 파일 목록 / 크기) 캐시 삭제
+    os.replace(tmp_dir, cache_dir)
+
+
+def read_tfrecord_shards(cache_dir):
+    feature_spec = {
+        "image": tf.io.FixedLenFeature([], tf.string),
+        "label": tf.io.FixedLenFeature([], tf.int64),
+    }
+
+    def parse(record):
+        example = tf.io.parse_single_example(record, feature_spec)
+        return tf.io.parse_tensor(example["image"], tf.uint8), tf.cast(example["label"], tf.int32)
+
+    files = tf.data.Dataset.list_files(os.path.join(cache_dir, "shard-*.tfrecord"), shuffle=False)
+    dataset = files.interleave(tf.data.TFRecordDataset, num_parallel_calls=AUTOTUNE, deterministic=True)
+    return dataset.map(parse, num_parallel_calls=AUTOTUNE)
+
+
+def get_image_dataset(data_dir, batch_size=32, target_size=(299, 299), training=False,
+                      augment=None, cache_dir=None, shuffle=None):
+    """
+    학습/검증용 tf.data 데이터셋 (이미지는 preprocess_input 적용, 라벨은 one-hot)
+
+    training=True 이면 섞고 get_data_generators 와 비슷한 증강(회전, 이동, 좌우 반전)을 적용
+    cache_dir 를 주면 리사이즈한 이미지를 TFRecord 샤드로 저장해두고 다음부터는 거기서 읽음
+    (파일 목록이나 target_size 가 바뀌면 다시 만듦)
+    반환값: (dataset, class_names)
+    """
+    augment = training if augment is None else augment
+    shuffle = training if shuffle is None else shuffle
+    paths, labels, class_names = list_image_files(data_dir)
+    num_classes = len(class_names)
+
+    if cache_dir is not None:
+        if not tfrecord_cache_valid(paths, labels, cache_dir, target_size):
+            write_tfrecord_shards(paths, labels, cache_dir, target_size)
+        dataset = read_tfrecord_shards(cache_dir)
+        if shuffle:
+            dataset = dataset.shuffle(min(len(paths), 10000))
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+        if shuffle:
+            dataset = dataset.shuffle(len(paths))  # 파일 경로 단계에서 섞어야 디코딩 전에 섞임
+        dataset = dataset.map(
+            lambda p, l: _decode_and_resize(p, l, target_size), num_parallel_calls=AUTOTUNE
+        )
+
+    dataset = dataset.batch(batch_size)
+
+    if augment:
+        augmentation = tf.keras.Sequential([
+            tf.keras.layers.RandomRotation(30 / 360, fill_mode="nearest"),
+            tf.keras.layers.RandomTranslation(0.2, 0.2, fill_mode="nearest"),
+            tf.keras.layers.RandomFlip("horizontal"),
+        ])
+        dataset = dataset.map(
+            lambda x, y: (augmentation(tf.cast(x, tf.float32), training=True), y),
+            num_parallel_calls=AUTOTUNE,
+        )
+
+    dataset = dataset.map(
+        lambda x, y: (preprocess_input(tf.cast(x, tf.float32)), tf.one_hot(y, num_classes)),
+        num_parallel_calls=AUTOTUNE,
+    )
+    return dataset.prefetch(AUTOTUNE), class_names
@@ -0,0 +1,123 @@
+# batcher.py
+# 요청마다 model.predict 를 따로 돌리지 않고, 짧은 시간 동안 들어온 이미지를
+# 하나의 배치로 묶어서 워커 스레드에서 한 번에 추론하는 스케줄러
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(RuntimeError):
+    # 큐에 기다리는 요청이 max_queue_size 개 이상이면 새 요청은 바로 거절 (main.py 에서 503)
+    pass
+
+
+class InferenceBatcher:
+    """
+    들어온 요청을 큐에 쌓았다가 max_batch_size 개가 모이거나
+    max_wait_ms 가 지나면 predict_fn 을 한 번 호출합니다.
+
+    predict_fn(items) 는 items 와 같은 길이의 리스트를 반환해야 하고,
+    그 원소가 Exception 이면 해당 요청만 실패로 처리합니다.
+
+    max_queue_size: 큐에서 기다릴 수 있는 최대 요청 수 (0 이면 제한 없음)
+    넘치면 submit 이 QueueFullError 를 던져서, 요청이 몰려도 대기 시간이 끝없이 늘지 않게 함
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=10, max_queue_size=0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._task = None
+        self._inflight = []  # 큐에서 꺼냈지만 아직 결과를 못 받은 요청 (모으는 중 + 추론 중)
+        self._stopped = False
+        # TensorFlow 추론은 한 번에 하나씩만 돌도록 워커 스레드 1개 사용
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # 아직 결과를 못 받은 요청(추론 중인 배치 + 큐에 남은 요청)은 바로 실패로 끝냄
+        error = RuntimeError("inference batcher stopped")
+        pending = [fut for _, fut in self._inflight]
+        self._inflight = []
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            pending.append(fut)
+        for fut in pending:
+            if not fut.done():
+                fut.set_exception(error)
+        self._executor.shutdown(wait=False)
+
+    async def run_exclusive(self, fn, *args):
+        # 배치 추론과 같은 워커 스레드에서 실행 (warmup 등이 추론과 동시에 돌지 않도록)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, item):
+        # 요청 하나를 큐에 넣고 자기 결과가 나올 때까지 기다림
+        if self._stopped:
+            raise RuntimeError("inference batcher stopped")
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"inference queue is full ({self.max_queue_size} waiting)") from None
+        return await future
+
+    async def _collect(self):
+        # 첫 요청이 올 때까지 기다린 뒤, 마감 시간 안에 들어온 요청을 최대한 묶음
+        # 꺼낸 요청은 바로 self._inflight 에 넣어서 stop() 때 빠지지 않게 함
+        batch = self._inflight = []
+        batch.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # 클라이언트가 끊겨서 취소된 요청은 추론하지 않음
+            batch = [(item, fut) for item, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_fn, items)
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, fut), result in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(result, Exception):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+            self._inflight = []
@@ -0,0 +1,388 @@
+# benchmark.py
+# /predict/ 부하 테스트 + 단계별(디코딩/전처리/추론/영양정보 조회) 시간 측정
+# 결과는 JSON 으로 저장해서 실행마다 비교할 수 있음
+#
+# 사용 예 (backend 폴더에서 실행):
+#   python benchmark.py --concurrency 1 4 16 --requests 200 --output bench.json
+#   python benchmark.py --url http://127.0.0.1:8000 --concurrency 8    # 이미 떠 있는 서버 대상
+#
+# --url 을 주지 않으면 main.py 의 app 을 같은 프로세스 안에서 uvicorn 으로 띄움
+# (이 경우 RSS 에 서버 메모리도 포함되고, 단계별 측정도 같이 함)
+# 단계별 peak_rss_mb 는 그 단계 동안 VmRSS 를 샘플링한 최대값, 맨 아래 peak_rss_mb 는 전체 최대값
+import argparse
+import glob
+import http.client
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "images")
+
+SYNTHETIC_SIZES = [(320, 240), (1024, 768), (4032, 3024)]
+SYNTHETIC_FORMATS = [("JPEG", "RGB", ".jpg"), ("PNG", "RGB", ".png"), ("WEBP", "RGB", ".webp"),
+                     ("PNG", "RGBA", ".png"), ("JPEG", "L", ".jpg")]
+
+
+# ===================== 테스트 이미지 =====================
+
+def synthetic_image(size, mode, seed):
+    # 그라데이션 + 노이즈 (단색 이미지보다 실제 사진에 가까운 압축률)
+    width, height = size
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 20, size=(height, width, 3)).astype(np.float32)
+    img = Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+    return img.convert(mode)
+
+
+def load_payloads(image_dir, synthetic=True):
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(image_dir, "*.jpg"))):
+        with open(path, "rb") as f:
+            payloads.append((os.path.basename(path), f.read()))
+    if synthetic:
+        for i, size in enumerate(SYNTHETIC_SIZES):
+            for fmt, mode, ext in SYNTHETIC_FORMATS:
+                buf = io.BytesIO()
+                synthetic_image(size, mode, seed=i).save(buf, format=fmt)
+                payloads.append((f"synthetic_{size[0]}x{size[1]}_{mode}{ext}", buf.getvalue()))
+    return payloads
+
+
+# ===================== HTTP 클라이언트 =====================
+
+def multipart_body(filename, data, unique):
+    # unique=True 이면 파일 끝에 임의 바이트를 붙여서 결과 캐시를 우회 (디코더는 뒤쪽 바이트를 무시)
+    if unique:
+        data = data + uuid.uuid4().bytes
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Client:
+    # 스레드마다 연결 하나를 유지 (keep-alive)
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            self._local.conn = conn
+        return conn
+
+    def request(self, method, path, body=None, headers=None):
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def predict(self, filename, data, unique):
+        body, content_type = multipart_body(filename, data, unique)
+        return self.request("POST", "/predict/", body, {"Content-Type": content_type})
+
+
+# ===================== 측정 =====================
+
+def percentiles(values_ms):
+    if not values_ms:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    values = np.array(values_ms)
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+    }
+
+
+def peak_rss_mb():
+    # 프로세스 시작 후 전체 최대값 (리눅스는 KB, macOS 는 byte 단위)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def current_rss_mb():
+    # 지금 RSS (/proc/self/status 의 VmRSS, 리눅스에서만 가능)
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """
+    측정 구간 동안 interval 초마다 현재 RSS 를 읽어서 그 구간의 최대값을 구합니다.
+    VmRSS 를 읽을 수 없는 환경이면 None (ru_maxrss 는 구간별 값을 줄 수 없음)
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def run_level(client, payloads, concurrency, num_requests, unique):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        filename, data = payloads[i % len(payloads)]
+        start = time.perf_counter()
+        try:
+            status, _ = client.predict(filename, data, unique)
+            ok = status == 200
+        except (http.client.HTTPException, OSError):
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(num_requests)))
+    duration = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": num_requests,
+        "errors": errors,
+        "duration_s": duration,
+        "req_per_s": len(latencies) / duration if duration else 0.0,
+        **percentiles(latencies),
+        "peak_rss_mb": rss.peak,  # 이 단계 동안의 최대 RSS
+    }
+
+
+def profile_stages(main, payloads, repeats):
+    # 서버를 거치지 않고 main.py 의 각 단계를 직접 호출해서 시간 측정
+    # 서버의 /metrics 지표가 섞이지 않도록 지표를 기록하지 않는 함수를 사용
+    from preprocessing import decode_image  # main.py 를 불러온 뒤라 backend 폴더가 sys.path 에 있음
+
+    timings = {"decode": [], "preprocess": [], "inference": [], "lookup": []}
+    for _ in range(repeats):
+        for _, data in payloads:
+            start = time.perf_counter()
+            img_array = decode_image(data)
+            timings["decode"].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            batch = main.preprocessor.fill_batch([img_array])
+            timings["preprocess"].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            predictions = main.model.predict(batch)
+            timings["inference"].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            main.format_result(*main.lookup_prediction(predictions[0]))
+            timings["lookup"].append((time.perf_counter() - start) * 1000)
+
+    stages = {name: percentiles(values) for name, values in timings.items()}
+
+    # 배치 추론 (BATCH_MAX_SIZE 장을 한 번에)
+    batch_size = main.BATCH_MAX_SIZE
+    images = [decode_image(payloads[i % len(payloads)][1]) for i in range(batch_size)]
+    batch_timings = []
+    for _ in range(max(repeats, 3)):
+        batch = main.preprocessor.fill_batch(images)
+        start = time.perf_counter()
+        main.model.predict(batch)
+        batch_timings.append((time.perf_counter() - start) * 1000)
+    stages["inference_batch"] = {"batch_size": batch_size, **percentiles(batch_timings)}
+    return stages
+
+
+# ===================== 서버 실행 =====================
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_process_server():
+    import uvicorn
+
+    # main.py 는 CSV / 가중치 파일을 현재 폴더 기준으로 읽음
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        # 시작하다 실패하면 (잘못된 MODEL_FORMAT, CSV 없음 등) 서버 스레드가 끝나버림
+        if not thread.is_alive():
+            raise RuntimeError("in-process server failed to start (see the log above)")
+        time.sleep(0.05)
+    return main, server, thread, f"http://127.0.0.1:{port}"
+
+
+def wait_until_ready(client, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, _ = client.request("GET", "/health/ready")
+            if status == 200:
+                return True
+        except (http.client.HTTPException, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def environment(main_module):
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    if main_module is None:
+        # 외부 서버는 설정을 알 수 없음 (이 프로세스의 환경변수와 다를 수 있음)
+        return {**info, "server_config": None}
+    # 같은 프로세스에서 띄운 서버가 실제로 사용한 값
+    return {
+        **info,
+        "server_config": {
+            "model_format": main_module.MODEL_FORMAT,
+            "model_path": main_module.MODEL_PATH,
+            "batch_max_size": main_module.BATCH_MAX_SIZE,
+            "batch_max_wait_ms": main_module.BATCH_MAX_WAIT_MS,
+            "decode_workers": main_module.DECODE_WORKERS or os.cpu_count(),  # ImagePreprocessor 기본값과 같음
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/predict/ 부하 테스트 및 단계별 지연 시간 측정")
+    parser.add_argument("--url", help="대상 서버 주소 (없으면 같은 프로세스에서 서버 실행)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="동시성 단계마다 보낼 요청 수")
+    parser.add_argument("--image-dir", default=DEFAULT_IMAGE_DIR)
+    parser.add_argument("--no-synthetic", action="store_true", help="합성 이미지 사용 안 함")
+    parser.add_argument("--cache", choices=["miss", "hit"], default="miss",
+                        help="miss: 요청마다 바이트를 바꿔서 결과 캐시 우회, hit: 같은 바이트 반복")
+    parser.add_argument("--stage-repeats", type=int, default=3, help="단계별 측정 반복 횟수 (0 이면 생략)")
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.image_dir, synthetic=not args.no_synthetic)
+    if not payloads:
+        parser.error(f"no images found in {args.image_dir}")
+
+    main_module = server = None
+    url = args.url
+    if url is None:
+        try:
+            main_module, server, thread, url = start_in_process_server()
+        except RuntimeError as e:
+            parser.error(str(e))
+
+    client = Client(url)
+    if not wait_until_ready(client, args.ready_timeout):
+        parser.error(f"server at {url} did not become ready")
+
+    # warmup (배치 크기별 그래프 생성 등이 측정에 섞이지 않도록)
+    # --cache hit 이면 같은 바이트로 보내서 결과 캐시도 미리 채움 (첫 단계에 miss 가 섞이지 않게)
+    run_level(client, payloads, max(args.concurrency), len(payloads), unique=args.cache == "miss")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": "in-process" if main_module is not None else url,
+        "environment": environment(main_module),
+        "payloads": [{"name": name, "bytes": len(data)} for name, data in payloads],
+        "cache_mode": args.cache,
+        "levels": [],
+    }
+    for concurrency in args.concurrency:
+        level = run_level(client, payloads, concurrency, args.requests, unique=args.cache == "miss")
+        report["levels"].append(level)
+        print(
+            f"concurrency={concurrency:3d} {level['req_per_s']:8.1f} req/s "
+            f"p50={level['p50_ms'] or 0:.1f} p95={level['p95_ms'] or 0:.1f} p99={level['p99_ms'] or 0:.1f} ms "
+            f"errors={level['errors']}"
+            + (f" rss={level['peak_rss_mb']:.0f}MB" if level["peak_rss_mb"] is not None else ""),
+            file=sys.stderr,
+        )
+
+    if main_module is not None and args.stage_repeats > 0:
+        report["stages"] = profile_stages(main_module, payloads, args.stage_repeats)
+    report["peak_rss_mb"] = peak_rss_mb()
+    report["peak_rss_includes_server"] = main_module is not None
+
+    if server is not None:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# compare_backends.py
+# 추론 백엔드별 정확도(top-1) / 속도 비교 도구
+# 첫 번째 백엔드를 기준으로, 나머지 백엔드의 top-1 정확도가 tolerance 이상 떨어지면 종료 코드 1
+#
+# 사용 예:
+#   python compare_backends.py --image-dir /data/food-101/images \
+#       keras:cp.ckpt.weights.h5 tflite:food_model_f16.tflite tflite:food_model_int8.tflite
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from food_dataset import load_split
+from inference_model import NUM_CLASSES, load_backend
+from preprocessing import ImagePreprocessor, decode_image
+
+
+def iter_batches(test_df, class_names, batch_size):
+    class_index = {name: i for i, name in enumerate(class_names)}
+    for start in range(0, len(test_df), batch_size):
+        rows = test_df.iloc[start:start + batch_size]
+        images = []
+        for filepath in rows['Filepath']:
+            with open(filepath, "rb") as f:
+                images.append(decode_image(f.read()))
+        labels = np.array([class_index[label] for label in rows['Label']])
+        yield images, labels
+
+
+def evaluate(spec, test_df, class_names, batch_size):
+    model_format, path = spec.split(":", 1)
+
+    start = time.perf_counter()
+    backend = load_backend(model_format, path)
+    load_seconds = time.perf_counter() - start
+
+    preprocessor = ImagePreprocessor(max_batch_size=batch_size, max_workers=1)
+    backend.predict(preprocessor.to_batch([np.zeros((224, 224, 3), dtype=np.uint8)]))  # warmup
+
+    predictions = []
+    correct = 0
+    batch_latencies = []
+    for images, labels in iter_batches(test_df, class_names, batch_size):
+        batch = preprocessor.to_batch(images)
+        start = time.perf_counter()
+        probabilities = backend.predict(batch)
+        batch_latencies.append(time.perf_counter() - start)
+        predicted = np.argmax(probabilities, axis=1)
+        predictions.append(predicted)
+        correct += int(np.sum(predicted == labels))
+    preprocessor.shutdown()
+
+    total_images = len(test_df)
+    batch_latencies = np.array(batch_latencies) * 1000
+    return {
+        "backend": spec,
+        "top1": correct / total_images if total_images else 0.0,
+        "load_seconds": load_seconds,
+        "ms_per_image": float(batch_latencies.sum() / total_images) if total_images else 0.0,
+        "batch_p50_ms": float(np.percentile(batch_latencies, 50)) if len(batch_latencies) else 0.0,
+        "batch_p95_ms": float(np.percentile(batch_latencies, 95)) if len(batch_latencies) else 0.0,
+    }, np.concatenate(predictions) if predictions else np.array([])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추론 백엔드 정확도 / 속도 비교")
+    parser.add_argument("backends", nargs="+", help="형식:경로 (예: keras:cp.ckpt.weights.h5), 첫 번째가 기준")
+    parser.add_argument("--image-dir", required=True,
+                        help="테스트 이미지 폴더 (<image_dir>/<음식 이름>/*.jpg, 모델 클래스 수와 같아야 함)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="허용하는 top-1 정확도 하락 (0.01 = 1%p)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    try:
+        _, test_df, class_names = load_split(args.image_dir, expected_classes=NUM_CLASSES)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"test split: {len(test_df)} images, {len(class_names)} classes")
+
+    results = []
+    reference = None
+    failed = False
+    for spec in args.backends:
+        result, predictions = evaluate(spec, test_df, class_names, args.batch_size)
+        if reference is None:
+            reference = (result, predictions)
+        else:
+            reference_result, reference_predictions = reference
+            result["agreement"] = float(np.mean(predictions == reference_predictions))
+            result["top1_drop"] = reference_result["top1"] - result["top1"]
+            result["within_tolerance"] = result["top1_drop"] <= args.tolerance
+            failed = failed or not result["within_tolerance"]
+        results.append(result)
+        print(
+            f"{spec:45s} top1={result['top1']:.4f} "
+            f"{result['ms_per_image']:.2f} ms/img "
+            f"p95={result['batch_p95_ms']:.1f} ms/batch "
+            f"load={result['load_seconds']:.1f}s"
+            + (f" agree={result['agreement']:.4f} drop={result['top1_drop']:+.4f}" if "agreement" in result else "")
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"tolerance": args.tolerance, "results": results}, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
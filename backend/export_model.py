@@ -0,0 +1,112 @@
+# export_model.py
+# 학습한 가중치(cp.ckpt.weights.h5)를 추론 전용 파일로 내보내는 스크립트
+#
+# 사용 예:
+#   python export_model.py --format savedmodel --output food_model
+#   python export_model.py --format frozen --output food_model.pb
+#   python export_model.py --format tflite --output food_model.tflite
+#   python export_model.py --format tflite --quantize float16 --output food_model_f16.tflite
+#   python export_model.py --format tflite --quantize int8 --calibration-dir /data/food-101/images --output food_model_int8.tflite
+#
+# 서버에서는 MODEL_FORMAT / MODEL_PATH 환경변수로 불러옴
+#   MODEL_FORMAT=tflite MODEL_PATH=food_model.tflite uvicorn main:app
+import argparse
+import json
+import os
+
+import tensorflow as tf
+from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+from food_dataset import load_split
+from inference_model import IMAGE_SHAPE, NUM_CLASSES, load_keras_model
+from preprocessing import ImagePreprocessor, decode_image
+
+
+def serving_function(model):
+    @tf.function(input_signature=[tf.TensorSpec((None, *IMAGE_SHAPE), tf.float32, name="images")])
+    def serve(images):
+        return {"probabilities": model(images, training=False)}
+
+    return serve
+
+
+def export_savedmodel(model, output):
+    module = tf.Module()
+    module.model = model
+    module.serve = serving_function(model)
+    tf.saved_model.save(module, output, signatures={"serving_default": module.serve})
+
+
+def export_frozen(model, output):
+    # 변수를 상수로 바꾼 GraphDef 한 파일 + 입력/출력 텐서 이름(.json)
+    concrete = serving_function(model).get_concrete_function()
+    frozen = convert_variables_to_constants_v2(concrete)
+    tf.io.write_graph(frozen.graph.as_graph_def(), os.path.dirname(output) or ".", os.path.basename(output), as_text=False)
+    with open(output + ".json", "w", encoding="utf-8") as f:
+        json.dump({"input": frozen.inputs[0].name, "output": frozen.outputs[0].name}, f)
+
+
+def representative_dataset(image_dir, num_samples, seed=1):
+    # int8 calibration 용: 학습 split 이미지에서 num_samples 장을 뽑아 서버와 같은 전처리를 적용
+    train_df, _, _ = load_split(image_dir, seed=seed, expected_classes=NUM_CLASSES)
+    filepaths = train_df['Filepath'].sample(min(num_samples, len(train_df)), random_state=seed)
+    preprocessor = ImagePreprocessor(max_batch_size=1, max_workers=1)
+
+    def generate():
+        for filepath in filepaths:
+            with open(filepath, "rb") as f:
+                img_array = decode_image(f.read())
+            yield [preprocessor.to_batch([img_array]).copy()]
+
+    return generate
+
+
+def export_tflite(model, output, quantize="none", calibration_dir=None, calibration_samples=200):
+    concrete = serving_function(model).get_concrete_function()
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    if quantize == "float16":
+        # 가중치만 float16 으로 저장 (파일 크기 절반, 정확도 손실 거의 없음)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        # 가중치 + 활성값 int8 (입력/출력은 float32 로 둬서 서버 코드는 그대로 사용)
+        if not calibration_dir:
+            raise ValueError("int8 quantization needs --calibration-dir")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(calibration_dir, calibration_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+
+
+EXPORTERS = {
+    "savedmodel": export_savedmodel,
+    "frozen": export_frozen,
+    "tflite": export_tflite,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추론 전용 모델 파일 내보내기")
+    parser.add_argument("--weights", default="cp.ckpt.weights.h5")
+    parser.add_argument("--format", choices=sorted(EXPORTERS), default="savedmodel")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--quantize", choices=["none", "float16", "int8"], default="none",
+                        help="tflite 전용 post-training 양자화")
+    parser.add_argument("--calibration-dir", help="int8 calibration 이미지 폴더 (images/<음식 이름>/*.jpg)")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.quantize != "none" and args.format != "tflite":
+        parser.error("--quantize is only supported with --format tflite")
+
+    model = load_keras_model(args.weights)
+    if args.format == "tflite":
+        export_tflite(model, args.output, args.quantize, args.calibration_dir, args.calibration_samples)
+    else:
+        EXPORTERS[args.format](model, args.output)
+    print(f"exported {args.format} model to {args.output} (quantize={args.quantize})")
+
+
+if __name__ == "__main__":
+    main()
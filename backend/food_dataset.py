@@ -0,0 +1,44 @@
+# food_dataset.py
+# 학습 노트북(food_classification.ipynb)과 같은 방식으로 이미지 목록을 나눔
+# images/<음식 이름>/*.jpg 구조에서 클래스마다 100장씩 뽑고 70% 학습 / 30% 테스트
+# (int8 양자화 calibration 과 정확도 비교 도구에서 사용, scikit-learn 필요)
+import os
+from pathlib import Path
+
+import pandas as pd
+
+
+def load_split(image_dir, samples_per_class=100, train_size=0.7, seed=1, expected_classes=None):
+    """
+    반환값: (train_df, test_df, class_names)
+    각 DataFrame 은 Filepath / Label 컬럼을 가지고,
+    class_names 는 flow_from_dataframe 의 class_indices 순서(이름순)와 같습니다.
+    expected_classes 를 주면 클래스 수가 다를 때 ValueError
+    (예: 음식별 폴더가 없는 평평한 폴더를 넘기면 폴더 이름 하나가 클래스가 됨)
+    """
+    from sklearn.model_selection import train_test_split
+
+    filepaths = list(Path(image_dir).glob(r'**/*.jpg'))
+    labels = list(map(lambda x: os.path.split(os.path.split(x)[0])[1], filepaths))
+
+    filepaths = pd.Series(filepaths, name='Filepath').astype(str)
+    labels = pd.Series(labels, name='Label')
+
+    images = pd.concat([filepaths, labels], axis=1)
+
+    num_classes = images['Label'].nunique()
+    if expected_classes is not None and num_classes != expected_classes:
+        raise ValueError(
+            f"{image_dir} has {num_classes} class folders, model expects {expected_classes} "
+            "(expected layout: <image_dir>/<food name>/*.jpg)"
+        )
+
+    category_samples = []
+    for category in images['Label'].unique():
+        category_slice = images.query("Label == @category")
+        category_samples.append(category_slice.sample(min(samples_per_class, len(category_slice)), random_state=seed))
+    image_df = pd.concat(category_samples, axis=0).sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+    train_df, test_df = train_test_split(image_df, train_size=train_size, shuffle=True, random_state=seed)
+    class_names = sorted(image_df['Label'].unique())
+    return train_df, test_df, class_names
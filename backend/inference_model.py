@@ -0,0 +1,239 @@
+# inference_model.py
+# 추론 백엔드 정의 / 불러오기 (MODEL_FORMAT 으로 선택)
+# - keras: MobileNetV2 + Dense 헤드를 만들고 cp.ckpt.weights.h5 를 불러옴 (기존 방식, 기본값)
+# - savedmodel / frozen / tflite: export_model.py 로 미리 만들어둔 추론 전용 파일을 불러옴
+#   (tflite 는 float32 / float16 / int8 양자화 모델 모두 사용 가능)
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+
+IMAGE_SHAPE = (224, 224, 3)
+NUM_CLASSES = 101
+
+
+def build_model(num_classes=NUM_CLASSES, base_weights=None):
+    """
+    학습 노트북과 같은 구조의 모델을 만듭니다.
+    cp.ckpt.weights.h5 에는 MobileNetV2 부분 가중치도 들어있어서
+    base_weights=None 으로 만들면 ImageNet 가중치를 따로 받지 않아도 됩니다.
+    """
+    pretrained_model = tf.keras.applications.MobileNetV2(
+        input_shape=IMAGE_SHAPE,
+        include_top=False,
+        weights=base_weights,
+        pooling='avg'
+    )
+    pretrained_model.trainable = False
+    inputs = pretrained_model.input
+
+    x = tf.keras.layers.Dense(128, activation='relu')(pretrained_model.output)
+    x = tf.keras.layers.Dense(128, activation='relu')(x)
+
+    outputs = tf.keras.layers.Dense(num_classes, activation='softmax')(x)
+
+    return tf.keras.Model(inputs, outputs)
+
+
+def load_keras_model(weights_path):
+    model = build_model()
+    model.load_weights(weights_path)
+    return model
+
+
+class InferenceBackend:
+    """
+    추론 백엔드 공통 인터페이스
+    predict(batch) 는 (N, 224, 224, 3) float32 배치를 받아 (N, 클래스 수) 확률 배열을 반환합니다.
+    """
+
+    name = None
+
+    def __init__(self, path):
+        self.path = path
+
+    def predict(self, batch):
+        raise NotImplementedError
+
+
+class KerasBackend(InferenceBackend):
+    name = "keras"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.model = load_keras_model(path)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class SavedModelBackend(InferenceBackend):
+    name = "savedmodel"
+
+    def __init__(self, path):
+        super().__init__(path)
+        loaded = tf.saved_model.load(path)
+        self._serve = loaded.signatures["serving_default"]
+        self._output_key = list(self._serve.structured_outputs)[0]
+
+    def predict(self, batch):
+        return self._serve(tf.constant(batch))[self._output_key].numpy()
+
+
+class FrozenGraphBackend(InferenceBackend):
+    # export_model.py --format frozen 으로 만든 .pb 파일과 이름 정보(.json)를 불러옴
+    name = "frozen"
+
+    def __init__(self, path):
+        super().__init__(path)
+        with open(path, "rb") as f:
+            graph_def = tf.compat.v1.GraphDef()
+            graph_def.ParseFromString(f.read())
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            names = json.load(f)
+
+        def _import():
+            tf.compat.v1.import_graph_def(graph_def, name="")
+
+        wrapped = tf.compat.v1.wrap_function(_import, [])
+        graph = wrapped.graph
+        self._fn = wrapped.prune(
+            feeds=graph.as_graph_element(names["input"]),
+            fetches=graph.as_graph_element(names["output"]),
+        )
+
+    def predict(self, batch):
+        return self._fn(tf.constant(batch)).numpy()
+
+
+class _TFLiteRunner:
+    """
+    인터프리터 하나 (스레드 사이에 공유하면 안 됨)
+    입력 크기는 만들 때 (chunk_size, 224, 224, 3) 으로 한 번만 정하고 바꾸지 않음
+    (요청마다 resize_tensor_input + allocate_tensors 를 하면 그때마다 메모리 재할당이 일어남)
+    """
+
+    def __init__(self, path, num_threads, chunk_size):
+        # model_path 로 열면 flatbuffer 파일을 메모리 맵으로 읽음 (인터프리터마다 복사본을 만들지 않음)
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.interpreter.resize_tensor_input(self.input["index"], (chunk_size, *IMAGE_SHAPE))
+        self.interpreter.allocate_tensors()
+
+    def run(self, batch):
+        # batch 크기는 항상 chunk_size (TFLiteBackend 에서 맞춰서 넘김)
+        interpreter = self.interpreter
+
+        # 입력/출력까지 int8 로 양자화된 모델이면 scale / zero_point 로 변환
+        input_dtype = self.input["dtype"]
+        if input_dtype != np.float32:
+            scale, zero_point = self.input["quantization"]
+            info = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+        interpreter.set_tensor(self.input["index"], batch)
+        interpreter.invoke()
+        result = interpreter.get_tensor(self.output["index"])
+        if self.output["dtype"] != np.float32:
+            scale, zero_point = self.output["quantization"]
+            return (result.astype(np.float32) - zero_point) * scale
+        return result.copy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    인터프리터 여러 개를 풀로 두고, 배치를 chunk_size 장씩 나눠서 동시에 돌립니다.
+    (invoke 중에는 GIL 을 놓기 때문에 스레드로 병렬 실행이 됨)
+    마지막 조각이 chunk_size 보다 작으면 0 으로 채워서 돌리고 결과에서 뺌
+
+    num_interpreters: 풀 크기 (TFLITE_INTERPRETERS, 기본값 CPU 코어 수 / num_threads)
+    num_threads: 인터프리터 하나가 쓰는 스레드 수 (TFLITE_THREADS, 기본값 1)
+    chunk_size: 인터프리터 하나가 한 번에 돌리는 이미지 수 (TFLITE_CHUNK_SIZE, 기본값 1)
+    """
+
+    name = "tflite"
+
+    def __init__(self, path, num_interpreters=None, num_threads=None, chunk_size=None):
+        super().__init__(path)
+        num_threads = num_threads or int(os.environ.get("TFLITE_THREADS", "1"))
+        num_interpreters = num_interpreters or int(os.environ.get("TFLITE_INTERPRETERS", "0"))
+        if not num_interpreters:
+            num_interpreters = max(1, (os.cpu_count() or 1) // num_threads)
+        chunk_size = chunk_size or int(os.environ.get("TFLITE_CHUNK_SIZE", "1"))
+
+        self._runners = queue.Queue()
+        for _ in range(num_interpreters):
+            self._runners.put(_TFLiteRunner(path, num_threads, chunk_size))
+        self.num_interpreters = num_interpreters
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=num_interpreters, thread_name_prefix="tflite")
+
+    def _run_chunk(self, chunk):
+        runner = self._runners.get()
+        try:
+            return runner.run(chunk)
+        finally:
+            self._runners.put(runner)
+
+    def predict(self, batch):
+        n = len(batch)
+        padding = -n % self.chunk_size
+        if padding:
+            batch = np.concatenate([batch, np.zeros((padding, *batch.shape[1:]), dtype=batch.dtype)])
+        chunks = [batch[i:i + self.chunk_size] for i in range(0, len(batch), self.chunk_size)]
+        if len(chunks) == 1:
+            results = [self._run_chunk(chunks[0])]
+        else:
+            results = list(self._executor.map(self._run_chunk, chunks))
+        return np.concatenate(results)[:n]
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (KerasBackend, SavedModelBackend, FrozenGraphBackend, TFLiteBackend)
+}
+
+
+def load_backend(model_format, path):
+    if model_format not in BACKENDS:
+        raise ValueError(f"unknown model format: {model_format} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[model_format](path)
+
+
+class LazyModel:
+    """
+    첫 요청(또는 warmup)때 백엔드를 불러오는 래퍼
+    배치를 한 번이라도 끝까지 돌리면 (warmup 또는 첫 요청) ready 가 True 가 되고,
+    readiness 체크에서 이 값을 사용합니다.
+    """
+
+    def __init__(self, model_format, path, warmup_batch_size=1):
+        if model_format not in BACKENDS:
+            raise ValueError(f"unknown model format: {model_format} (choose from {', '.join(BACKENDS)})")
+        self.model_format = model_format
+        self.path = path
+        self.warmup_batch_size = warmup_batch_size
+        self.ready = False
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = load_backend(self.model_format, self.path)
+        return self._backend
+
+    def predict(self, batch):
+        backend = self._backend or self._load()
+        result = backend.predict(batch)
+        self.ready = True
+        return result
+
+    def warmup(self):
+        # 그래프 생성/메모리 할당이 첫 실제 요청에서 일어나지 않도록 빈 배치를 한 번 돌림
+        batch = np.zeros((self.warmup_batch_size, *IMAGE_SHAPE), dtype=np.float32)
+        self.predict(batch)
@@ -1,54 +1,44 @@
 from fastapi import FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-import tensorflow as tf
-from tensorflow.keras.applications.inception_v3 import InceptionV3, preprocess_input, decode_predictions
-import tensorflow as tf
 import numpy as np
-from PIL import Image
-import pandas as pd
 import io
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 import os
+import asyncio
+import logging
+import json
+import hashlib
+import zipfile
+import zlib
+from typing import List
+from batcher import InferenceBatcher, QueueFullError
+from result_cache import ResultCache
+from preprocessing import ImagePreprocessor
+from nutrition_index import NutritionIndexHolder
+from inference_model import LazyModel
+from metrics import (
+    REGISTRY, STAGE_SECONDS, BATCH_SIZE, QUEUE_DEPTH, PREDICTION_CONFIDENCE,
+    CACHE_HITS, CACHE_MISSES, CACHE_HIT_RATIO, sampled_log,
+)
 
 
 app = FastAPI()
 
+# 로그 설정 (예측 결과는 LOG_SAMPLE_RATE 비율만큼만 기록, 1 이면 전부)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("food_api")
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # project 디렉토리 기준
 FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
 
-#모델 선언언
-pretrained_model = tf.keras.applications.MobileNetV2(
-    input_shape=(224, 224, 3),
-    include_top=False,
-    weights='imagenet',
-    pooling='avg'
-)
-pretrained_model.trainable = False
-inputs = pretrained_model.input
-
-x = tf.keras.layers.Dense(128, activation='relu')(pretrained_model.output)
-x = tf.keras.layers.Dense(128, activation='relu')(x)
-
-outputs = tf.keras.layers.Dense(101, activation='softmax')(x)
-#outputs = tf.keras.layers.Dense(107, activation='softmax')(x)
-
-model = tf.keras.Model(inputs, outputs)
-
-
-#모델 불러오기
-model.load_weights("cp.ckpt.weights.h5")
-
-
-
-
-
-
-
-
-
-
-
+#모델 선언 (MODEL_FORMAT: keras / savedmodel / frozen / tflite, export_model.py 참고)
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "keras")
+MODEL_PATH = os.environ.get("MODEL_PATH", "cp.ckpt.weights.h5")
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") != "0"  # 0 이면 첫 readiness 체크(또는 첫 요청) 때 불러옴
 
+#모델 불러오기는 warmup 또는 첫 요청 때 (import 시점에는 하지 않음)
+model = LazyModel(MODEL_FORMAT, MODEL_PATH)
 
 # CORS 설정
 app.add_middleware(
@@ -59,79 +49,134 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# CSV 파일 로드
-food_df = pd.read_csv("food_info.csv")  # CSV 파일에 음식, 칼로리, 영양성분 정보가 있어야 함
-food_li = pd.read_csv("food_list.csv")
-# InceptionV3 모델 로드
-<<<<<<< HEAD
-#model = InceptionV3(weights="imagenet") -> 원래코드
-
-#==================모델선언=========================
-
-pretrained_model = tf.keras.applications.MobileNetV2(
-    input_shape=(224, 224, 3),
-    include_top=False,
-    weights='imagenet',
-    pooling='avg'
+# CSV 파일 로드 -> 영양 정보 인덱스 (CSV 가 바뀌면 다시 읽고, 캐시된 응답은 비움)
+nutrition = NutritionIndexHolder(
+    "food_info.csv",  # CSV 파일에 음식, 칼로리, 영양성분 정보가 있어야 함
+    "food_list.csv",
+    on_reload=lambda: result_cache.set_version(cache_version()),
+)
+NUTRITION_RELOAD_INTERVAL = float(os.environ.get("NUTRITION_RELOAD_INTERVAL", "5"))  # 0 이면 감시 안 함
+
+# 배치 설정 (환경변수로 조정 가능)
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "10"))
+BATCH_MAX_QUEUE = int(os.environ.get("BATCH_MAX_QUEUE", "256"))  # 추론 대기 요청이 이만큼 쌓이면 503 (0 이면 제한 없음)
+DECODE_WORKERS = int(os.environ.get("DECODE_WORKERS", "0")) or None  # 기본값: CPU 코어 수
+
+# 이미지 디코딩/전처리 (스레드풀 + float32 배치 버퍼)
+preprocessor = ImagePreprocessor(max_batch_size=BATCH_MAX_SIZE, max_workers=DECODE_WORKERS)
+
+# 예측 확률 -> (음식 이름, 확률, FoodRecord)
+# 클래스 인덱스로 바로 영양 정보까지 찾음 (이름으로 다시 찾지 않음)
+# lookup_prediction 은 지표를 기록하지 않음 (benchmark.py 단계별 측정에서 사용)
+def lookup_prediction(prediction):
+    predicted_class = np.argmax(prediction)  # 가장 확률이 높은 클래스 선택
+    confidence = np.max(prediction)  # 해당 클래스의 확률 값
+
+    record = nutrition.current.for_class(predicted_class)  # food_list.csv 순서 = 클래스 인덱스
+    if record is not None:
+        food_name = record.food_name
+    else:
+        food_name = "Unknown" # 매칭되는 음식이 없을 경우
+
+    return food_name, confidence, record
+
+# 서버 요청 처리용 (예측 확률 지표도 기록)
+def decode_prediction(prediction):
+    food_name, confidence, record = lookup_prediction(prediction)
+    PREDICTION_CONFIDENCE.observe(float(confidence))
+    return food_name, confidence, record
+
+# 배치 추론 함수 (batcher 워커 스레드에서 실행)
+def predict_batch(img_arrays):
+    BATCH_SIZE.observe(len(img_arrays))
+    batch = preprocessor.to_batch(img_arrays)
+    with STAGE_SECONDS["inference"].time():
+        predictions = model.predict(batch)
+    return [decode_prediction(p) for p in predictions]
+
+batcher = InferenceBatcher(
+    predict_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, max_queue_size=BATCH_MAX_QUEUE,
 )
-pretrained_model.trainable = False
-inputs = pretrained_model.input
-
-x = tf.keras.layers.Dense(128, activation='relu')(pretrained_model.output)
-x = tf.keras.layers.Dense(128, activation='relu')(x)
-
-outputs = tf.keras.layers.Dense(101, activation='softmax')(x)
-#outputs = tf.keras.layers.Dense(107, activation='softmax')(x)
-
-model = tf.keras.Model(inputs, outputs)
-
-
-#모델 불러오기
-model.load_weights("cp.ckpt.weights.h5")
-
-#==================모델선언=========================
-
-=======
-# model = InceptionV3(weights="imagenet")
->>>>>>> 713bad1d9a31f78297ae5c5ebcf7180eee1298bb
-
-# 음식 예측 함수
-def classify_food(image_bytes):
-    img = Image.open(io.BytesIO(image_bytes)).resize((224, 224))  # MobileNetV2 크기
-    img_array = np.array(img) / 255.0  # 정규화
-    img_array = np.expand_dims(img_array, axis=0)
 
-    predictions = model.predict(img_array)
-    predicted_class = np.argmax(predictions)  # 가장 확률이 높은 클래스 선택
-    confidence = np.max(predictions)  # 해당 클래스의 확률 값
-    print("mmmmmmmmmmmmm ",predicted_class)
-    # food_df에서 food_name과 클래스 인덱스를 매핑하는 컬럼이 필요
-    # if "class_index" in food_df.columns:
-    #     food_name = food_df.loc[food_df["class_index"] == predicted_class, "food_name"].values
-    #     if len(food_name) > 0:
-    #         return food_name[0], confidence
-    
+# 캐시 버전: 모델 형식 / 경로 / 수정 시각 + 영양 정보 CSV 수정 시각
+# 하나라도 바뀌면 저장된 응답은 맞지 않으므로 캐시를 비움 (서버 재시작 사이에 바뀐 경우 포함)
+def cache_version():
+    model_file = MODEL_PATH
+    if os.path.isdir(model_file):  # SavedModel 은 폴더
+        model_file = os.path.join(model_file, "saved_model.pb")
     try:
-        food_name = food_li.iloc[predicted_class, 0]  # 첫 번째 컬럼(음식 이름) 선택
-        print("mmmmmmmmmmmmm ",food_name)
+        model_mtime = os.stat(model_file).st_mtime_ns
+    except OSError:
+        model_mtime = None
+    parts = [MODEL_FORMAT, os.path.abspath(MODEL_PATH), model_mtime, list(nutrition.current.mtimes)]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:16]
+
+# 결과 캐시 설정 (RESULT_CACHE_DB 를 지정하면 SQLite 디스크 캐시도 사용)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("RESULT_CACHE_TTL", "3600")),
+    db_path=os.environ.get("RESULT_CACHE_DB") or None,
+    max_db_entries=int(os.environ.get("RESULT_CACHE_DB_SIZE", "100000")),
+    version=cache_version(),
+)
 
-    except IndexError:
-        food_name = "Unknown"
+# /metrics 를 읽을 때 현재 값을 가져오는 지표
+QUEUE_DEPTH.set_function(batcher.queue_depth)
+CACHE_HITS.set_function(lambda: result_cache.hits)
+CACHE_MISSES.set_function(lambda: result_cache.misses)
+CACHE_HIT_RATIO.set_function(lambda: result_cache.stats()["hit_ratio"])
 
-    return food_name, confidence # 매칭되는 음식이 없을 경우
+# 음식 예측 함수 (배치 스케줄러 사용, 이벤트 루프를 막지 않음)
+async def classify_food_async(image_bytes):
+    img_array = await preprocessor.decode_async(image_bytes)
+    return await batcher.submit(img_array)
 
-# CSV에서 음식 정보 조회
-def get_food_info(food_name: str):
-    food_row = food_df[food_df['food_name'].str.lower() == food_name.lower()]
-    if not food_row.empty:
-        row = food_row.iloc[0]
-        return {
-            "calories": float(row["calories"]),  # float으로 변환
-            "protein": float(row["protein"]),
-            "carbs": float(row["carbs"]),
-            "fats": float(row["fats"])
-        }
-    return None
+# 모델 불러오기 + warmup 배치 (끝나야 /health/ready 가 200)
+# 배치 추론 워커 스레드에서 돌려서 실제 요청 추론과 겹치지 않게 함
+async def warmup_model():
+    try:
+        await batcher.run_exclusive(model.warmup)
+    except Exception:
+        logger.exception("model warmup failed")
+
+# warmup 이 돌고 있지 않으면 시작 (실패해서 끝났으면 다시 시도)
+def start_warmup():
+    task = getattr(app.state, "warmup", None)
+    if task is None or task.done():
+        app.state.warmup = asyncio.create_task(warmup_model())
+
+# 서버 시작/종료 시 배치 스케줄러 관리
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+    if WARMUP_ON_STARTUP:
+        start_warmup()
+    if NUTRITION_RELOAD_INTERVAL > 0:
+        app.state.nutrition_watch = asyncio.create_task(nutrition.watch(NUTRITION_RELOAD_INTERVAL))
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    watch_task = getattr(app.state, "nutrition_watch", None)
+    if watch_task is not None:
+        watch_task.cancel()
+    await batcher.stop()
+    preprocessor.shutdown()
+    result_cache.close()
+
+# 상태 체크 (liveness / readiness)
+@app.get("/health/live")
+def health_live():
+    return {"status": "ok"}
+
+# WARMUP_ON_STARTUP=0 이면 readiness 체크가 warmup 을 시작함
+# (ready 가 아니면 요청을 보내지 않는 로드밸런서 / k8s 에서도 준비 상태가 될 수 있도록)
+@app.get("/health/ready")
+async def health_ready():
+    if model.ready:
+        return {"status": "ready", "model_format": MODEL_FORMAT}
+    start_warmup()
+    return JSONResponse(status_code=503, content={"status": "warming up", "model_format": MODEL_FORMAT})
 
 # 기본 상태 체크 및 HTML 연결
 @app.get("/", response_class=HTMLResponse)
@@ -150,21 +195,20 @@ def get_favicon():
 @app.get("/script.js", response_class=HTMLResponse)
 def get_script():
     script_path = os.path.join(FRONTEND_DIR, "script.js")
-    print(f"Looking for script at: {script_path}")
+    logger.debug("Looking for script at: %s", script_path)
     if os.path.exists(script_path):
         with open(script_path, "r", encoding="utf-8") as file:
             return file.read()
     return {"error": "script.js not found"}
 
-# 이미지 분석 API
-@app.post("/predict/")
-async def predict(file: UploadFile = File(...)):
-    print(f"Looking for script at: ")
-    image_bytes = await file.read()
-    food_name, confidence = classify_food(image_bytes)
+# 예측 결과 + 영양 정보 -> 응답 형태 (format_result 는 지표를 기록하지 않음)
+def build_result(food_name, confidence, record=None):
+    with STAGE_SECONDS["lookup"].time():
+        return format_result(food_name, confidence, record)
+
+def format_result(food_name, confidence, record=None):
+    food_info = record.as_dict() if record is not None and record.has_nutrition else None
 
-    food_info = get_food_info(food_name)
-    
     if food_info:
         return {
             "food": food_name,
@@ -174,6 +218,129 @@ async def predict(file: UploadFile = File(...)):
     else:
         return {"food": food_name, "confidence": float(confidence), "message": "영양 정보 없음"}
 
+# 이미지 분석 API
+@app.post("/predict/")
+async def predict(file: UploadFile = File(...)):
+    with STAGE_SECONDS["upload_read"].time():
+        image_bytes = await file.read()
+    cache_key = result_cache.key(image_bytes)
+    version_at_start = result_cache.version  # 처리 중에 영양 정보가 바뀌면 결과를 캐시에 넣지 않기 위해
+    cached = await result_cache.get(cache_key)
+    if cached is not None:
+        sampled_log(logger, LOG_SAMPLE_RATE, "prediction", food=cached.get("food"), confidence=cached.get("confidence"), cached=True)
+        return cached
+
+    try:
+        food_name, confidence, record = await classify_food_async(image_bytes)
+    except QueueFullError as e:
+        # 대기열이 꽉 찼으면 기다리게 하지 않고 바로 거절 (클라이언트가 잠시 후 다시 시도)
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"})
+
+    result = build_result(food_name, confidence, record)
+    result_cache.put(cache_key, result, version=version_at_start)
+    sampled_log(logger, LOG_SAMPLE_RATE, "prediction", food=food_name, confidence=float(confidence), cached=False)
+    return result
+
+# Prometheus 지표 API
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# 영양 정보 CSV 다시 읽기 (관리자용)
+@app.post("/admin/reload-nutrition")
+async def reload_nutrition():
+    index = await asyncio.to_thread(nutrition.reload)
+    return {"foods": len(index.by_name), "classes": len(index.by_class)}
+
+# 캐시 상태 확인 API
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp")
+ZIP_MAX_ENTRIES = int(os.environ.get("ZIP_MAX_ENTRIES", "200"))  # zip 하나에서 읽을 최대 이미지 수
+ZIP_MAX_BYTES = int(os.environ.get("ZIP_MAX_BYTES", str(200 * 1024 * 1024)))  # 압축 해제 후 최대 크기
+
+# zip 안의 파일 하나 읽기 -> (파일 이름, 이미지 바이트, 에러)
+# 암호가 걸렸거나 (RuntimeError), 지원하지 않는 압축 방식이거나 (NotImplementedError),
+# 압축 데이터가 깨졌으면 (BadZipFile / zlib.error) 그 파일만 에러로 처리
+def read_zip_entry(zf, info):
+    try:
+        return info.filename, zf.read(info), None
+    except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError) as e:
+        return info.filename, None, f"cannot read zip entry: {e}"
+
+# zip 파일 -> (파일 이름, 이미지 바이트, 에러) 목록
+# 깨진 zip 이거나 제한을 넘으면 (zip 이름, None, 에러 메시지) 한 개만 반환
+# 압축 해제가 오래 걸릴 수 있으므로 이벤트 루프가 아닌 스레드에서 호출
+def read_zip(filename, data):
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            infos = [
+                info for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            # 압축을 풀기 전에 개수 / 전체 크기를 먼저 확인 (zip bomb 방지)
+            if len(infos) > ZIP_MAX_ENTRIES:
+                return [(filename, None, f"zip has {len(infos)} images (limit {ZIP_MAX_ENTRIES})")]
+            total_size = sum(info.file_size for info in infos)
+            if total_size > ZIP_MAX_BYTES:
+                return [(filename, None, f"zip uncompressed size {total_size} bytes exceeds limit {ZIP_MAX_BYTES}")]
+            return [read_zip_entry(zf, info) for info in infos]
+    except zipfile.BadZipFile as e:
+        return [(filename, None, f"invalid zip file: {e}")]
+
+# 업로드 파일 목록 -> (파일 이름, 이미지 바이트, 에러) 목록 (zip 파일은 안의 이미지로 풀어줌)
+async def read_uploads(files):
+    images = []
+    for file in files:
+        with STAGE_SECONDS["upload_read"].time():
+            data = await file.read()
+        filename = file.filename or ""
+        if filename.lower().endswith(".zip") or zipfile.is_zipfile(io.BytesIO(data)):
+            images.extend(await asyncio.to_thread(read_zip, filename, data))
+        else:
+            images.append((filename, data, None))
+    return images
+
+# 이미지 하나 분석 (디코딩은 스레드풀에서 병렬로, 추론은 batcher 로 묶어서)
+async def classify_one(index, filename, image_bytes, error=None):
+    if error is not None:
+        return {"index": index, "filename": filename, "error": error}
+    try:
+        cache_key = result_cache.key(image_bytes)
+        version_at_start = result_cache.version
+        result = await result_cache.get(cache_key)
+        if result is None:
+            img_array = await preprocessor.decode_async(image_bytes)
+            food_name, confidence, record = await batcher.submit(img_array)
+            result = build_result(food_name, confidence, record)
+            result_cache.put(cache_key, result, version=version_at_start)
+    except Exception as e:
+        logger.warning("batch prediction failed for %s: %s", filename, e)
+        result = {"error": str(e)}
+    return {"index": index, "filename": filename, **result}
+
+# 여러 이미지 분석 API (끝나는 순서대로 NDJSON 한 줄씩 전송)
+@app.post("/predict/batch")
+async def predict_batch_api(files: List[UploadFile] = File(...)):
+    images = await read_uploads(files)
+
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(classify_one(i, name, data, error))
+            for i, (name, data, error) in enumerate(images)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
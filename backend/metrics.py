@@ -0,0 +1,188 @@
+# metrics.py
+# 가벼운 Prometheus 형식 지표 (Counter / Gauge / Histogram) + 샘플링 로그
+# 요청 처리 중에는 숫자 몇 개만 더하고, 텍스트 변환은 /metrics 를 읽을 때만 함
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _format_labels(labels, extra=None):
+    items = list((labels or {}).items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    type_name = None
+
+    def __init__(self, name, help_text, labels=None, registry=None):
+        self.name = name
+        self.help = help_text
+        self.labels = labels or {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def samples(self):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    증가만 하는 값. fn 을 주면 값을 직접 들고 있지 않고 읽을 때 fn() 을 호출합니다.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name, help_text, labels=None, fn=None, registry=None):
+        super().__init__(name, help_text, labels, registry)
+        self.value = 0
+        self.fn = fn
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn() if self.fn is not None else self.value
+        yield self.name, None, value
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, labels=None, fn=None, registry=None):
+        super().__init__(name, help_text, labels, registry)
+        self.value = 0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn() if self.fn is not None else self.value
+        yield self.name, None, value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    # 기본 구간: 0.5ms ~ 10s (단위: 초)
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS, labels=None, registry=None):
+        super().__init__(name, help_text, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield self.name + "_bucket", {"le": _format_value(bound)}, cumulative
+        yield self.name + "_sum", None, total
+        yield self.name + "_count", None, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        # 같은 이름(라벨만 다른) 지표는 HELP / TYPE 를 한 번만 출력
+        families = {}
+        for metric in list(self._metrics):
+            families.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, metrics in families.items():
+            lines.append(f"# HELP {name} {metrics[0].help}")
+            lines.append(f"# TYPE {name} {metrics[0].type_name}")
+            for metric in metrics:
+                for sample_name, extra_labels, value in metric.samples():
+                    lines.append(f"{sample_name}{_format_labels(metric.labels, extra_labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ===================== 서비스 지표 =====================
+
+STAGES = ("upload_read", "decode", "preprocess", "inference", "lookup")
+STAGE_SECONDS = {
+    stage: Histogram(
+        "food_stage_duration_seconds",
+        "Time spent in each request processing stage",
+        labels={"stage": stage},
+    )
+    for stage in STAGES
+}
+
+BATCH_SIZE = Histogram(
+    "food_inference_batch_size",
+    "Number of images per model forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+QUEUE_DEPTH = Gauge("food_inference_queue_depth", "Images waiting for the batch scheduler")
+
+PREDICTION_CONFIDENCE = Histogram(
+    "food_prediction_confidence",
+    "Top-1 softmax probability of model predictions",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99),
+)
+
+CACHE_HITS = Counter("food_result_cache_hits_total", "Result cache hits")
+CACHE_MISSES = Counter("food_result_cache_misses_total", "Result cache misses")
+CACHE_HIT_RATIO = Gauge("food_result_cache_hit_ratio", "Result cache hits / lookups since start")
+
+
+# ===================== 샘플링 로그 =====================
+
+def sampled_log(logger, rate, event, **fields):
+    """
+    rate 비율(0~1)만큼만 한 줄짜리 JSON 로그를 남깁니다. (요청마다 stdout 에 쓰지 않도록)
+    """
+    if rate > 0 and (rate >= 1 or random.random() < rate) and logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
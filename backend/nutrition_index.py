@@ -0,0 +1,137 @@
+# nutrition_index.py
+# food_info.csv / food_list.csv 를 서버 시작 때 한 번 읽어서 만든 조회용 인덱스
+# 요청 처리 중에는 pandas 를 쓰지 않고 dict / tuple 조회만 함
+import asyncio
+import logging
+import os
+from types import MappingProxyType
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name):
+    return str(name).strip().lower()
+
+
+class FoodRecord:
+    """
+    음식 하나의 영양 정보 (칼로리, 단백질, 탄수화물, 지방)
+    영양 정보가 없는 클래스는 has_nutrition 이 False 입니다.
+    """
+
+    __slots__ = ("food_name", "calories", "protein", "carbs", "fats")
+
+    def __init__(self, food_name, calories=None, protein=None, carbs=None, fats=None):
+        self.food_name = food_name
+        self.calories = calories
+        self.protein = protein
+        self.carbs = carbs
+        self.fats = fats
+
+    @property
+    def has_nutrition(self):
+        return self.calories is not None
+
+    def as_dict(self):
+        return {
+            "calories": self.calories,
+            "protein": self.protein,
+            "carbs": self.carbs,
+            "fats": self.fats,
+        }
+
+
+class NutritionIndex:
+    """
+    by_name: 정규화된 음식 이름 -> FoodRecord
+    by_class: 모델 클래스 인덱스 -> FoodRecord (food_list.csv 순서)
+    """
+
+    __slots__ = ("by_name", "by_class", "mtimes")
+
+    def __init__(self, by_name, by_class, mtimes):
+        self.by_name = MappingProxyType(by_name)
+        self.by_class = tuple(by_class)
+        self.mtimes = mtimes
+
+    def lookup(self, food_name):
+        return self.by_name.get(normalize_name(food_name))
+
+    def for_class(self, class_index):
+        if 0 <= class_index < len(self.by_class):
+            return self.by_class[class_index]
+        return None
+
+
+def _mtimes(paths):
+    return tuple(os.stat(path).st_mtime_ns for path in paths)
+
+
+def load_index(info_path, list_path):
+    mtimes = _mtimes((info_path, list_path))
+    food_df = pd.read_csv(info_path)  # 음식, 칼로리, 영양성분 정보
+    food_li = pd.read_csv(list_path)  # 모델 클래스 순서대로 된 음식 이름
+
+    by_name = {}
+    for row in food_df.itertuples(index=False):
+        key = normalize_name(row.food_name)
+        if key in by_name:  # 같은 이름이 여러 줄이면 첫 번째 줄 사용
+            continue
+        by_name[key] = FoodRecord(
+            row.food_name,
+            float(row.calories),
+            float(row.protein),
+            float(row.carbs),
+            float(row.fats),
+        )
+
+    by_class = []
+    for name in food_li.iloc[:, 0]:  # 첫 번째 컬럼(음식 이름)
+        record = by_name.get(normalize_name(name))
+        if record is None:
+            record = FoodRecord(name)
+        else:
+            record = FoodRecord(name, record.calories, record.protein, record.carbs, record.fats)
+        by_class.append(record)
+
+    return NutritionIndex(by_name, by_class, mtimes)
+
+
+class NutritionIndexHolder:
+    """
+    현재 인덱스를 들고 있다가 CSV 가 바뀌면 새로 만들어서 통째로 교체합니다.
+    교체는 참조 하나를 바꾸는 것이라 요청 처리 중인 쪽은 기존 인덱스를 그대로 씁니다.
+    """
+
+    def __init__(self, info_path, list_path, on_reload=None):
+        self.info_path = info_path
+        self.list_path = list_path
+        self.on_reload = on_reload
+        self.current = load_index(info_path, list_path)
+
+    def changed(self):
+        try:
+            return _mtimes((self.info_path, self.list_path)) != self.current.mtimes
+        except OSError:
+            return False
+
+    def reload(self):
+        index = load_index(self.info_path, self.list_path)
+        self.current = index
+        if self.on_reload is not None:
+            self.on_reload()
+        logger.info("nutrition index reloaded: %d foods, %d classes", len(index.by_name), len(index.by_class))
+        return index
+
+    async def watch(self, interval):
+        # interval 초마다 파일 수정 시각을 확인해서 바뀌었으면 다시 읽음
+        while True:
+            await asyncio.sleep(interval)
+            if not self.changed():
+                continue
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("nutrition index reload failed, keeping previous index")
@@ -0,0 +1,78 @@
+# preprocessing.py
+# 업로드 이미지 디코딩 + 전처리 단계
+# - JPEG 은 draft 모드로 224 근처 크기까지 줄여서 디코딩 (폰 사진 원본 크기로 풀지 않음)
+# - RGBA / 흑백 이미지도 RGB 로 한 번만 변환
+# - float64 중간 배열 없이 미리 잡아둔 float32 배치 버퍼에 바로 기록
+import asyncio
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+from tensorflow.keras.applications.mobilenet_v2 import preprocess_input  # 학습 노트북과 같은 정규화
+
+from metrics import STAGE_SECONDS
+
+IMAGE_SIZE = (224, 224)  # MobileNetV2 입력 크기
+
+
+def decode_image(image_bytes):
+    """
+    이미지 바이트 -> (224, 224, 3) uint8 배열
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("RGB", IMAGE_SIZE)  # JPEG 만 적용됨 (DCT 단계에서 1/2, 1/4, 1/8 로 축소)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    # 학습 때 flow_from_dataframe(load_img) 기본값과 같은 nearest 보간 사용
+    img = img.resize(IMAGE_SIZE, Image.NEAREST)
+    return np.asarray(img, dtype=np.uint8)
+
+
+class ImagePreprocessor:
+    """
+    디코딩은 CPU 코어 수만큼의 스레드풀에서 병렬로 처리하고 (PIL 은 디코딩/리사이즈 중 GIL 을 놓음),
+    배치로 묶을 때는 스레드마다 하나씩 미리 잡아둔 float32 버퍼에 써서 모델 입력을 만듭니다.
+    """
+
+    def __init__(self, max_batch_size=16, max_workers=None):
+        self.max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            thread_name_prefix="decode",
+        )
+        self._local = threading.local()
+
+    def decode(self, image_bytes):
+        with STAGE_SECONDS["decode"].time():
+            return decode_image(image_bytes)
+
+    async def decode_async(self, image_bytes):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.decode, image_bytes)
+
+    def _buffer(self, size):
+        buf = getattr(self._local, "buffer", None)
+        if buf is None or buf.shape[0] < size:
+            buf = np.empty((max(size, self.max_batch_size), *IMAGE_SIZE, 3), dtype=np.float32)
+            self._local.buffer = buf
+        return buf
+
+    def fill_batch(self, img_arrays):
+        """
+        uint8 이미지 배열 목록 -> 정규화된 (N, 224, 224, 3) float32 배치 (지표 기록 없음)
+        반환값은 버퍼의 view 라서 다음 fill_batch / to_batch 호출 전까지만 유효합니다.
+        """
+        batch = self._buffer(len(img_arrays))[:len(img_arrays)]
+        for i, img_array in enumerate(img_arrays):
+            batch[i] = img_array  # uint8 -> float32 변환하면서 바로 기록
+        return preprocess_input(batch)  # [-1, 1] 로 정규화 (float 배열은 제자리에서 계산)
+
+    def to_batch(self, img_arrays):
+        with STAGE_SECONDS["preprocess"].time():
+            return self.fill_batch(img_arrays)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
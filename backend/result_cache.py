@@ -0,0 +1,184 @@
+# result_cache.py
+# 같은 사진이 다시 올라오면 디코딩/추론 없이 바로 응답하기 위한 결과 캐시
+# 1단계: 메모리 LRU, 2단계(선택): SQLite 파일 (서버 재시작 후에도 유지)
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ResultCache:
+    """
+    업로드 바이트의 sha256 해시를 키로 /predict/ 응답(dict)을 저장합니다.
+
+    max_entries: 메모리에 보관할 최대 개수 (넘으면 가장 오래 안 쓴 것부터 삭제)
+    ttl_seconds: 저장 후 이 시간이 지나면 만료 (0 이면 만료 없음)
+    db_path: 지정하면 SQLite 디스크 캐시도 사용
+    max_db_entries: 디스크 캐시 최대 개수
+    version: 모델 / 영양 정보 버전 문자열. 디스크 캐시에 저장된 버전과 다르면 시작할 때 비움
+
+    메모리 조회는 이벤트 루프에서 바로 하고, SQLite 읽기/쓰기는 전용 스레드 하나에서만 합니다.
+    (쓰기는 기다리지 않고 스레드 큐에 넘기는 write-behind 방식)
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, db_path=None, max_db_entries=100000, version=""):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.version = version
+        self._memory = OrderedDict()  # key -> (저장 시각, 결과)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_executor = None
+        self._puts_since_trim = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+            self._db_executor.submit(self._db_open, db_path).result()
+
+    @staticmethod
+    def key(image_bytes):
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    async def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, result = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return dict(result)
+                del self._memory[key]
+
+        if self._db_executor is not None:
+            version = self.version
+            loop = asyncio.get_running_loop()
+            row = await loop.run_in_executor(self._db_executor, self._db_get, key)
+            if row is not None and not self._expired(row[1], now):
+                result = json.loads(row[0])
+                with self._lock:
+                    # 조회하는 동안 버전이 바뀌었으면 (캐시가 비워졌으면) 옛 결과는 쓰지 않음
+                    if self.version == version:
+                        self._remember(key, row[1], result)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return dict(result)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result, version=None):
+        """
+        version 을 주면 그 값이 현재 버전과 같을 때만 저장합니다.
+        (요청 처리 중에 모델 / 영양 정보가 바뀌었으면 옛 결과를 넣지 않음)
+        """
+        now = time.time()
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._remember(key, now, dict(result))
+            if self._db_executor is not None:
+                self._db_executor.submit(self._db_put, key, json.dumps(result, ensure_ascii=False), now)
+
+    def set_version(self, version):
+        # 영양 정보가 바뀌었을 때처럼 저장된 응답이 더 이상 맞지 않을 때 사용
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._memory.clear()
+            if self._db_executor is not None:
+                self._db_executor.submit(self._db_reset, version)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+            "version": self.version,
+        }
+
+    def close(self):
+        if self._db_executor is not None:
+            self._db_executor.submit(self._db.close)
+            self._db_executor.shutdown(wait=True)
+            self._db_executor = None
+
+    def _remember(self, key, created, result):
+        self._memory[key] = (created, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ---------- 아래는 SQLite 전용 스레드에서만 실행 ----------
+
+    def _db_open(self, db_path):
+        self._db = sqlite3.connect(db_path)
+        # WAL + synchronous=NORMAL: 커밋마다 fsync 하지 않음 (캐시라 마지막 몇 건은 잃어도 됨)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            # 서버가 꺼져 있는 동안 모델이나 영양 정보가 바뀌었으면 전부 버림
+            self._db_reset(self.version)
+        else:
+            self._purge_expired()
+            self._db.commit()
+
+    def _db_get(self, key):
+        return self._db.execute(
+            "SELECT value, created FROM results WHERE key = ?", (key,)
+        ).fetchone()
+
+    def _db_put(self, key, value, created):
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+            (key, value, created),
+        )
+        # 개수 제한은 매번 하지 않고 가끔씩만 정리
+        self._puts_since_trim += 1
+        if self._puts_since_trim >= 100:
+            self._trim_db()
+            self._puts_since_trim = 0
+        self._db.commit()
+
+    def _db_reset(self, version):
+        self._db.execute("DELETE FROM results")
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+        self._db.commit()
+
+    def _purge_expired(self):
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+
+    def _trim_db(self):
+        self._purge_expired()
+        self._db.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_db_entries,),
+        )